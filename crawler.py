@@ -1,5 +1,8 @@
+import re
 import json
+import asyncio
 import hashlib
+from functools import lru_cache
 from datetime import datetime
 from pathlib import Path
 from urllib.parse import urlparse, urljoin, urldefrag
@@ -9,6 +12,59 @@ from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
 from crawl4ai.markdown_generation_strategy import DefaultMarkdownGenerator
 from crawl4ai.async_dispatcher import MemoryAdaptiveDispatcher, RateLimiter, CrawlerMonitor, DisplayMode
 
+# 文件名中需要替换为下划线的字符(路径分隔符及Windows非法字符)
+_FILENAME_TRANS = str.maketrans({c: '_' for c in '/\\<>:"|?*\0'})
+
+# 匹配路径中连续的斜杠
+_MULTI_SLASH = re.compile(r'/{2,}')
+
+
+@lru_cache(maxsize=131072)
+def _normalize_url(url):
+    """
+    规范化URL的缓存实现，同一URL在爬取过程中会被多次规范化。
+    
+    :param url: 要规范化的URL
+    :type url: str
+    :return: 规范化后的URL
+    :rtype: str
+    """
+    # 去除URL片段(#部分)并解析URL
+    parsed = urlparse(urldefrag(url)[0])
+    
+    # 合并路径中重复的斜杠，空路径视为根路径
+    path = _MULTI_SLASH.sub('/', parsed.path or '/')
+    
+    # 重建URL，不包含查询参数等
+    return f'{parsed.scheme}://{parsed.netloc}{path}'
+
+
+@lru_cache(maxsize=64)
+def _scope_prefixes(url_scope, base_domain):
+    """
+    将域名限制和URL范围合并为规范化URL需要匹配的前缀元组。
+    
+    规范化URL形如scheme://netloc/path，因此“netloc等于base_domain且以url_scope开头”
+    等价于以返回的某个前缀开头，可用一次str.startswith完成检查。
+    
+    :param url_scope: URL范围限制，可为空
+    :type url_scope: str or None
+    :param base_domain: 基础域名
+    :type base_domain: str
+    :return: 允许的URL前缀，空元组表示不允许任何URL
+    :rtype: tuple
+    """
+    if not url_scope:
+        return (f'http://{base_domain}/', f'https://{base_domain}/')
+    
+    scope_parsed = urlparse(url_scope)
+    if scope_parsed.netloc != base_domain:
+        # 范围与基础域名不一致时，任何URL都无法同时满足两个条件
+        return ()
+    
+    # 范围不含路径时补上'/'，避免匹配到以该域名为前缀的其他域名
+    return (url_scope if scope_parsed.path else f'{url_scope}/',)
+
 
 class WebsiteCrawler:
     """
@@ -44,7 +100,7 @@ class WebsiteCrawler:
         self.pages_dir = None
         self.progress_bar = None
         
-        # 内容指纹缓存，用于检测重复内容
+        # 内容指纹缓存，用于检测重复内容，保存原始摘要字节而非十六进制字符串以节省内存
         self.content_fingerprints = set()
         # 规范化URL映射表，用于识别实际上相同的URL
         self.canonical_urls = {}
@@ -83,8 +139,8 @@ class WebsiteCrawler:
         if not path or path == '/':
             path = 'index'
         else:
-            # 去除前导和尾随斜杠，替换剩余斜杠
-            path = path.strip('/').replace('/', '_')
+            # 去除前导和尾随斜杠，一次替换剩余斜杠及文件名中的非法字符
+            path = path.strip('/').translate(_FILENAME_TRANS)
         
         # 裁剪路径长度，防止文件名过长
         if len(path) > 50:
@@ -101,40 +157,39 @@ class WebsiteCrawler:
         :return: 规范化后的URL
         :rtype: str
         """
-        # 去除URL片段(#部分)
-        url_no_frag = urldefrag(url)[0]
-        
-        # 解析URL
-        parsed = urlparse(url_no_frag)
-        
-        # 处理路径，确保路径以/结尾，如果是目录的话
-        path = parsed.path
-        if not path:
-            path = '/'
-        
-        # 重建URL，不包含查询参数等
-        normalized = f"{parsed.scheme}://{parsed.netloc}{path}"
-        
-        # 去除重复的斜杠
-        while '//' in normalized:
-            normalized = normalized.replace('//', '/')
-        
-        # 确保有正确的协议分隔符
-        normalized = normalized.replace('://', ':/').replace(':/', '://')
-        
-        return normalized
+        return _normalize_url(url)
     
     def get_content_fingerprint(self, content):
         """
         生成内容的指纹，用于检测重复内容
         
-        :param content: 页面内容
-        :type content: str
-        :return: 内容指纹
-        :rtype: str
+        :param content: 页面内容，已编码的字节可直接传入以避免重复编码
+        :type content: str or bytes
+        :return: 内容指纹(16字节摘要)
+        :rtype: bytes
         """
-        # 使用MD5计算内容哈希值
-        return hashlib.md5(content.encode('utf-8')).hexdigest()
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        
+        # 使用128位BLAKE2b计算内容哈希值，仅用于去重，比MD5更快
+        return hashlib.blake2b(content, digest_size=16).digest()
+    
+    @staticmethod
+    def _write_page_file(filepath, header, content_bytes):
+        """
+        将页面文档写入Markdown文件，在线程中执行。
+        
+        :param filepath: 文件路径
+        :type filepath: Path
+        :param header: 正文之前的元数据和标题部分
+        :type header: str
+        :param content_bytes: UTF-8编码的页面正文
+        :type content_bytes: bytes
+        """
+        with open(filepath, 'wb') as f:
+            f.write(header.encode('utf-8'))
+            f.write(content_bytes)
+            f.write(b'\n')
     
     async def save_page(self, url, title, content):
         """
@@ -153,8 +208,11 @@ class WebsiteCrawler:
         if not self.pages_dir:
             raise ValueError('Pages directory not set up')
         
+        # 正文只编码一次，同时用于计算指纹和写入文件
+        content_bytes = content.encode('utf-8')
+        
         # 检查内容重复
-        fingerprint = self.get_content_fingerprint(content)
+        fingerprint = self.get_content_fingerprint(content_bytes)
         if fingerprint in self.content_fingerprints:
             logger.warning(f'检测到重复内容，跳过保存: {url}')
             return None
@@ -169,24 +227,65 @@ class WebsiteCrawler:
         filename = self.get_safe_filename(normalized_url)
         filepath = self.pages_dir / filename
         
-        # 直接保存为Markdown文件
-        with open(filepath, 'w', encoding='utf-8') as f:
-            # 添加页面元数据作为YAML前置元数据
-            f.write('---\n')
-            f.write(f'url: {url}\n')
-            f.write(f'title: {title}\n')
-            f.write(f'date: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}\n')
-            f.write(f'fingerprint: {fingerprint}\n')
-            f.write('---\n\n')
-            
-            # 添加标题和正文
-            f.write(f'# {title}\n\n')
-            f.write(f'URL: [{url}]({url})\n\n')
-            f.write(f'{content}\n')
+        # 组装正文之前的部分：YAML前置元数据和标题
+        header = (
+            '---\n'
+            f'url: {url}\n'
+            f'title: {title}\n'
+            f'date: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}\n'
+            f'fingerprint: {fingerprint.hex()}\n'
+            '---\n\n'
+            f'# {title}\n\n'
+            f'URL: [{url}]({url})\n\n'
+        )
+
+        # 在线程中写入文件，避免阻塞事件循环中的爬取任务
+        await asyncio.to_thread(self._write_page_file, filepath, header, content_bytes)
         
         logger.debug(f'页面保存到: {filepath}')
         return filepath
     
+    def _parse_page_file(self, page_file):
+        """
+        读取并解析单个页面文件，在线程中执行。
+        
+        :param page_file: 页面文件路径
+        :type page_file: Path
+        :return: 解析结果元组 (URL, 标题, 指纹, 内容) 或 None
+        :rtype: tuple or None
+        """
+        logger.debug(f'读取页面文件: {page_file}')
+        try:
+            with open(page_file, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except Exception as e:
+            logger.error(f'读取页面文件 {page_file} 失败: {str(e)}')
+            return None
+        
+        # 解析YAML前置元数据
+        meta_parts = content.split('---', 2)
+        if len(meta_parts) < 3:
+            logger.warning(f'文件格式不正确，无法解析元数据: {page_file}')
+            return None
+        
+        meta_text = meta_parts[1].strip()
+        main_content = meta_parts[2].strip()
+        
+        # 提取元数据
+        url = None
+        title = None
+        fingerprint = None
+        
+        for line in meta_text.split('\n'):
+            if line.startswith('url:'):
+                url = line.replace('url:', '').strip()
+            elif line.startswith('title:'):
+                title = line.replace('title:', '').strip()
+            elif line.startswith('fingerprint:'):
+                fingerprint = line.replace('fingerprint:', '').strip()
+        
+        return url, title, fingerprint, main_content
+    
     async def read_all_pages(self):
         """
         读取所有保存的页面文件。
@@ -201,44 +300,29 @@ class WebsiteCrawler:
         all_pages = {}
         unique_fingerprints = set()  # 用于防止重复内容
         
-        for page_file in self.pages_dir.glob('*.md'):  # 修改为读取.md文件
-            logger.debug(f'读取页面文件: {page_file}')
-            try:
-                with open(page_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    
-                    # 解析YAML前置元数据
-                    meta_parts = content.split('---', 2)
-                    if len(meta_parts) >= 3:
-                        meta_text = meta_parts[1].strip()
-                        main_content = meta_parts[2].strip()
-                        
-                        # 提取元数据
-                        url = None
-                        title = None
-                        fingerprint = None
-                        
-                        for line in meta_text.split('\n'):
-                            if line.startswith('url:'):
-                                url = line.replace('url:', '').strip()
-                            elif line.startswith('title:'):
-                                title = line.replace('title:', '').strip()
-                            elif line.startswith('fingerprint:'):
-                                fingerprint = line.replace('fingerprint:', '').strip()
-                        
-                        # 检查是否已有相同内容
-                        if fingerprint and fingerprint not in unique_fingerprints:
-                            unique_fingerprints.add(fingerprint)
-                            if url and title:
-                                # 使用规范化URL作为键，避免相同内容的不同URL版本
-                                normalized_url = self.normalize_url(url)
-                                all_pages[normalized_url] = (title, main_content)
-                        else:
-                            logger.debug(f'跳过重复内容: {url}')
-                    else:
-                        logger.warning(f'文件格式不正确，无法解析元数据: {page_file}')
-            except Exception as e:
-                logger.error(f'读取页面文件 {page_file} 失败: {str(e)}')
+        # 在线程中并行读取文件，结果按文件顺序返回
+        page_files = list(self.pages_dir.glob('*.md'))  # 修改为读取.md文件
+        parsed_pages = await asyncio.gather(*(
+            asyncio.to_thread(self._parse_page_file, page_file)
+            for page_file in page_files
+        ))
+        
+        # 在主线程中进行去重，避免对集合加锁
+        for parsed in parsed_pages:
+            if not parsed:
+                continue
+            
+            url, title, fingerprint, main_content = parsed
+            
+            # 检查是否已有相同内容
+            if fingerprint and fingerprint not in unique_fingerprints:
+                unique_fingerprints.add(fingerprint)
+                if url and title:
+                    # 使用规范化URL作为键，避免相同内容的不同URL版本
+                    normalized_url = self.normalize_url(url)
+                    all_pages[normalized_url] = (title, main_content)
+            else:
+                logger.debug(f'跳过重复内容: {url}')
         
         return all_pages
     
@@ -314,6 +398,7 @@ class WebsiteCrawler:
             
             if links and 'internal' in links:
                 new_urls = []
+                scope_prefixes = _scope_prefixes(url_scope, base_domain)
                 
                 for link in links['internal']:
                     next_url = link.get('href', '')
@@ -329,26 +414,17 @@ class WebsiteCrawler:
                     if normalized_url in visited:
                         continue
                         
-                    # 检查URL是否在允许范围内
-                    url_parsed = urlparse(normalized_url)
-                    
-                    # 检查是否同一域名
-                    if url_parsed.netloc != base_domain:
-                        logger.debug(f'跳过非同域URL: {normalized_url}')
-                        continue
-                    
-                    # 检查是否在URL范围内
-                    if url_scope and not normalized_url.startswith(url_scope):
-                        logger.debug(f'URL不在指定范围内，跳过: {normalized_url}')
+                    # 一次前缀匹配同时检查是否同一域名且在URL范围内
+                    if not normalized_url.startswith(scope_prefixes):
                         continue
                     
-                    # 添加规范化URL到待爬取队列
-                    if normalized_url not in to_crawl:
-                        new_urls.append(normalized_url)
-                        to_crawl.append(normalized_url)
-                        visited.add(normalized_url)
-                        # 记录规范化映射
-                        self.canonical_urls[next_url] = normalized_url
+                    # 添加规范化URL到待爬取队列，入队即加入visited，
+                    # 上面的集合检查已保证不会重复入队
+                    new_urls.append(normalized_url)
+                    to_crawl.append(normalized_url)
+                    visited.add(normalized_url)
+                    # 记录规范化映射
+                    self.canonical_urls[next_url] = normalized_url
                 
                 return new_urls
         
@@ -3,7 +3,6 @@ import asyncio
 import sys
 from pathlib import Path
 from urllib.parse import urlparse
-from tqdm.asyncio import tqdm
 from loguru import logger
 import shutil
 
@@ -12,6 +11,20 @@ from logger_setup import LoggerSetup
 from crawler import WebsiteCrawler
 from markdown_generator import MarkdownGenerator
 
+def _purge_directory(directory):
+    """
+    清空目录中的所有文件和子目录，保留目录本身。
+
+    :param directory: 要清空的目录
+    :type directory: Path
+    """
+    for item in directory.iterdir():
+        if item.is_file():
+            item.unlink()
+        elif item.is_dir():
+            shutil.rmtree(item)
+
+
 async def async_main(args):
     """
     异步主函数，处理命令行参数并执行网站爬取和Markdown生成流程。
@@ -35,24 +48,17 @@ async def async_main(args):
             logger.warning(f"输出目录 '{output_dir}' 已存在，操作已取消。使用 --force 参数覆盖。")
             return 0
         
-        # 用户同意覆盖，先清空目录
+        # 用户同意覆盖，先在线程中清空目录，避免阻塞事件循环
         try:
-            if output_dir.exists():
-                for item in output_dir.iterdir():
-                    if item.is_file():
-                        item.unlink()
-                    elif item.is_dir():
-                        shutil.rmtree(item)
+            await asyncio.to_thread(_purge_directory, output_dir)
         except Exception as e:
             logger.error(f"清空目录失败: {str(e)}")
             return 1
     
-    # 配置日志系统
+    # 配置日志系统，同时会创建输出目录(logs目录的父目录)
     log_dir = output_dir / 'logs'
     log_file = LoggerSetup.setup(log_dir, args.verbose)
     
-    # 使用pathlib创建输出目录
-    output_dir.mkdir(parents=True, exist_ok=True)
     logger.info(f'输出目录: {output_dir}')
     logger.debug(f'爬取配置 - URL: {args.url}, 深度: {args.depth}, 超时: {args.timeout}秒')
     
@@ -134,8 +140,12 @@ def main():
 
     args = parser.parse_args()
 
-    # 运行异步主函数
-    return asyncio.run(async_main(args))
+    # 运行异步主函数，优先使用基于libuv的uvloop事件循环(Windows下不可用)
+    try:
+        import uvloop
+    except ImportError:
+        return asyncio.run(async_main(args))
+    return uvloop.run(async_main(args))
 
 
 if __name__ == '__main__':
@@ -1,9 +1,11 @@
 from pathlib import Path
+from operator import itemgetter
 from urllib.parse import urlparse
 from datetime import datetime
 from loguru import logger
 import hashlib
 import re
+import zlib
 
 class MarkdownGenerator:
     """处理将爬取的网站内容转换为Markdown文档"""
@@ -31,10 +33,37 @@ class MarkdownGenerator:
         """
         # 创建锚点ID
         anchor = title.replace(' ', '-').lower()
-        # 为确保唯一性，可以加入URL的哈希
-        url_hash = hashlib.md5(url.encode()).hexdigest()[:8]
+        # 为确保唯一性，加入URL的CRC32校验值(8位十六进制)
+        url_hash = format(zlib.crc32(url.encode()) & 0xffffffff, '08x')
         return f"{anchor}-{url_hash}"
     
+    def _compute_pages_hash(self, pages, start_url, url_scope, depth):
+        """
+        计算生成输入的内容哈希，用于判断输出文件是否需要重新生成。
+        
+        :param pages: 页面内容字典 {URL: (标题, 内容)}
+        :type pages: dict
+        :param start_url: 起始URL
+        :type start_url: str
+        :param url_scope: URL范围
+        :type url_scope: str
+        :param depth: 爬取深度
+        :type depth: int
+        :return: 十六进制哈希值
+        :rtype: str
+        """
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f'{start_url}\0{url_scope}\0{depth}\0'.encode('utf-8'))
+        for url, (title, content) in sorted(pages.items()):
+            # 使用\0分隔各字段，避免不同拼接方式产生相同的输入
+            h.update(url.encode('utf-8'))
+            h.update(b'\0')
+            h.update(title.encode('utf-8'))
+            h.update(b'\0')
+            h.update(content.encode('utf-8'))
+            h.update(b'\0')
+        return h.hexdigest()
+    
     def generate_markdown(self, pages, start_url, url_scope, depth):
         """
         将页面内容生成为Markdown文档。
@@ -61,60 +90,73 @@ class MarkdownGenerator:
         # 创建输出文件路径
         output_md_file = self.output_dir / f'{safe_domain}_site.md'
         
+        # 输入内容与上次生成时相同则直接复用已有文件
+        hash_file = output_md_file.with_suffix('.md.hash')
+        pages_hash = self._compute_pages_hash(pages, start_url, url_scope, depth)
+        try:
+            if output_md_file.exists() and hash_file.read_text(encoding='utf-8').strip() == pages_hash:
+                logger.info(f'页面内容未变化，跳过生成Markdown文件: {output_md_file}')
+                return output_md_file
+        except OSError:
+            # 哈希文件不存在或无法读取时，正常重新生成
+            pass
+        
         logger.info(f'开始生成Markdown文件: {output_md_file}')
         
         try:
-            # 组织为单个Markdown文件
-            with open(output_md_file, 'w', encoding='utf-8') as f:
-                # 添加文档标题和元信息
-                f.write(f'# {domain} 网站内容\n\n')
-                f.write(f'源网站: [{start_url}]({start_url})\n\n')
-                f.write(f'爬取时间: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}\n\n')
-                f.write(f'爬取深度: {depth}\n\n')
-                f.write(f'URL范围: {url_scope}\n\n')
-                
-                f.write('---\n\n')
-                
-                # 创建目录
-                f.write('## 目录\n\n')
-                
-                # 首先处理首页
-                if start_url in pages:
-                    f.write(f'* [首页](#首页)\n')
-                
-                # 然后处理其他页面，按标题排序
-                sorted_pages = sorted(
-                    [(url, title, content) for url, (title, content) in pages.items() if url != start_url], 
-                    key=lambda x: x[1]  # 按标题排序
-                )
-                
-                for url, title, _ in sorted_pages:
-                    # 创建唯一锚点ID
-                    anchor = self._create_unique_anchor(title, url)
-                    # 添加目录项
-                    f.write(f'* [{title}](#{anchor})\n')
-                
-                f.write('\n---\n\n')
+            # 目录和正文分别收集到列表中，最后一次性写入文件
+            toc_parts = ['## 目录\n\n']
+            body_parts = []
+            
+            # 首先处理首页
+            if start_url in pages:
+                _, content = pages[start_url]
                 
-                # 首先处理首页内容
-                if start_url in pages:
-                    title, content = pages[start_url]
-                    
-                    f.write(f'## 首页\n\n')
-                    f.write(f'URL: [{start_url}]({start_url})\n\n')
-                    f.write(f'{content}\n\n')
-                    f.write('---\n\n')
+                toc_parts.append(f'* [首页](#首页)\n')
+                body_parts.append(f'## 首页\n\nURL: [{start_url}]({start_url})\n\n')
+                body_parts.append(content)
+                body_parts.append('\n\n---\n\n')
+            
+            # 然后处理其他页面，按标题排序
+            sorted_pages = [(url, title, content) for url, (title, content) in pages.items() if url != start_url]
+            sorted_pages.sort(key=itemgetter(1))  # 按标题原地排序
+            
+            # 单次遍历同时生成目录项和页面内容
+            for url, title, content in sorted_pages:
+                # 添加目录项，每个页面只计算一次唯一锚点ID
+                toc_parts.append(f'* [{title}](#{self._create_unique_anchor(title, url)})\n')
                 
-                # 然后处理其他页面内容
-                for url, title, content in sorted_pages:
-                    # 创建页面锚点
-                    anchor = self._create_unique_anchor(title, url)
-                    
-                    # 写入页面内容
-                    f.write(f'## {title}\n\n')
-                    f.write(f'URL: [{url}]({url})\n\n')
-                    f.write(f'{content}\n\n')
-                    f.write('---\n\n')
+                # 添加页面内容
+                body_parts.append(f'## {title}\n\nURL: [{url}]({url})\n\n')
+                body_parts.append(content)
+                body_parts.append('\n\n---\n\n')
+            
+            # 按顺序拼接文档标题和元信息、目录、正文
+            parts = [
+                f'# {domain} 网站内容\n\n'
+                f'源网站: [{start_url}]({start_url})\n\n'
+                f'爬取时间: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}\n\n'
+                f'爬取深度: {depth}\n\n'
+                f'URL范围: {url_scope}\n\n'
+                '---\n\n'
+            ]
+            parts.extend(toc_parts)
+            parts.append('\n---\n\n')
+            parts.extend(body_parts)
+            
+            # 先删除旧的哈希文件，避免写入中途失败时残留的哈希与截断的输出文件匹配
+            try:
+                hash_file.unlink()
+            except FileNotFoundError:
+                pass
+            
+            # 组织为单个Markdown文件，以二进制模式写入预先编码的内容，
+            # 跳过文本层的逐次编码，并使用较大的缓冲区
+            with open(output_md_file, 'wb', buffering=1 << 20) as f:
+                f.writelines(part.encode('utf-8') for part in parts)
+            
+            # 记录本次生成输入的哈希，供下次比较
+            hash_file.write_text(pages_hash, encoding='utf-8')
             
             logger.info(f'Markdown文件生成完成: {output_md_file}')
             return output_md_file